@@ -0,0 +1,27 @@
+"""
+Ahead-of-time compile the geometry kernels into the installation_kernels extension module
+Run at build/deploy time, and again after every change to geometry_kernels.py:
+    python build_kernels.py
+main.py imports the compiled module when present and built from the current source, so the
+first request pays no JIT latency; otherwise it falls back to the JIT kernels in geometry_kernels.py
+"""
+from numba.pycc import CC
+
+import geometry_kernels
+from kernel_version import kernels_source_hash
+
+cc = CC("installation_kernels")
+
+for _name in geometry_kernels.EXPORTED_KERNELS:
+    # Export the undecorated Python function under the same name and signature as the JIT kernel
+    cc.export(_name, geometry_kernels.KERNEL_SIGNATURES[_name])(getattr(geometry_kernels, _name).py_func)
+
+# Fingerprint of the source this module is built from; main.py rejects a stale build
+SOURCE_HASH = kernels_source_hash()
+
+@cc.export("kernels_source_hash", "int64()")
+def _kernels_source_hash():
+    return SOURCE_HASH
+
+if __name__ == "__main__":
+    cc.compile()
\ No newline at end of file
@@ -0,0 +1,121 @@
+"""
+Geometry kernels for installation symbol detection
+Numba-compiled numeric kernels shared by main.py (JIT) and build_kernels.py (AOT)
+"""
+import math
+from numba import njit
+
+# Match codes emitted by the classification kernels, indexing GEOMETRIC_MATCH_SHAPES in main.py
+MATCH_NONE = 0
+MATCH_CIRCLE = 1
+MATCH_SQUARE = 2
+MATCH_RECTANGLE = 3
+MATCH_LINE = 4
+
+# Explicit signatures, so the JIT compiles at import and the AOT build exports the same types.
+# Classification kernels take (drawing array, rule bounds, out codes, out areas), where the rule
+# bounds array holds the (min_area, max_area, min_exclusive) band per match code, with
+# min_exclusive 1.0 when the band excludes min_area itself.
+KERNEL_SIGNATURES = {
+    "dist_sq_xy": "float64(float64, float64, float64, float64)",
+    "is_circle_xy": "boolean(float64, float64, float64, float64, float64, float64)",
+    "circle_area_xy": "float64(float64, float64, float64, float64, float64, float64)",
+    "within_rule_bounds": "int64(int64, float64, float64[:, :])",
+    "classify_rects": "void(float64[:, :], float64[:, :], int64[:], float64[:])",
+    "classify_curves": "void(float64[:, :], float64[:, :], int64[:], float64[:])",
+    "classify_lines": "void(float64[:, :], float64[:, :], int64[:], float64[:])",
+}
+
+# Kernels used from Python, exported by the AOT build. The built installation_kernels module
+# embeds a hash of this file; after any change here rerun python build_kernels.py; main.py
+# ignores a stale build and falls back to the JIT kernels.
+EXPORTED_KERNELS = ("classify_rects", "classify_curves", "classify_lines")
+
+@njit(KERNEL_SIGNATURES["dist_sq_xy"], cache=True, nogil=True)
+def dist_sq_xy(x1, y1, x2, y2):
+    """Squared distance between (x1, y1) and (x2, y2)"""
+    dx = x2 - x1
+    dy = y2 - y1
+    return dx * dx + dy * dy
+
+@njit(KERNEL_SIGNATURES["is_circle_xy"], cache=True, nogil=True)
+def is_circle_xy(p1x, p1y, p2x, p2y, p3x, p3y):
+    """Check if three curve points are approximately equidistant from their centroid"""
+    center_x = (p1x + p2x + p3x) / 3
+    center_y = (p1y + p2y + p3y) / 3
+    
+    # True radii are needed here: the tolerance is relative to the mean radius
+    d1 = math.sqrt(dist_sq_xy(center_x, center_y, p1x, p1y))
+    d2 = math.sqrt(dist_sq_xy(center_x, center_y, p2x, p2y))
+    d3 = math.sqrt(dist_sq_xy(center_x, center_y, p3x, p3y))
+    
+    # Calculate average distance and check if all points are close to it
+    avg_dist = (d1 + d2 + d3) / 3
+    if avg_dist == 0:
+        # All points coincide
+        return False
+    tolerance = 0.2  # 20% tolerance
+    
+    return (abs(d1 - avg_dist) / avg_dist < tolerance and
+            abs(d2 - avg_dist) / avg_dist < tolerance and
+            abs(d3 - avg_dist) / avg_dist < tolerance)
+
+@njit(KERNEL_SIGNATURES["circle_area_xy"], cache=True, nogil=True)
+def circle_area_xy(p1x, p1y, p2x, p2y, p3x, p3y):
+    """Estimate circle area from three curve points, radius measured from the centroid"""
+    center_x = (p1x + p2x + p3x) / 3
+    center_y = (p1y + p2y + p3y) / 3
+    return math.pi * dist_sq_xy(center_x, center_y, p1x, p1y)
+
+@njit(KERNEL_SIGNATURES["within_rule_bounds"], cache=True, nogil=True)
+def within_rule_bounds(code, area, bounds):
+    """Keep a match code only if area falls in the rule band of its shape"""
+    min_area = bounds[code, 0]
+    if bounds[code, 2] != 0.0:
+        if min_area < area <= bounds[code, 1]:
+            return code
+    elif min_area <= area <= bounds[code, 1]:
+        return code
+    return MATCH_NONE
+
+# Classification kernels - one pass per drawing class, writing a match code and the
+# measured area per row. They run with the GIL released so pages analyzed in worker
+# threads overlap; prange is not used because Numba's default workqueue threading
+# layer aborts on concurrent launches.
+@njit(KERNEL_SIGNATURES["classify_rects"], cache=True, nogil=True)
+def classify_rects(rect_arr, bounds, out_code, out_area):
+    """Classify rectangle rows as outlet squares or switch rectangles"""
+    for i in range(rect_arr.shape[0]):
+        width = rect_arr[i, 4]
+        height = rect_arr[i, 5]
+        area = width * height
+        out_area[i] = area
+        
+        # Square-like (aspect ratio close to 1)
+        if height != 0 and 0.8 <= width / height <= 1.2:
+            out_code[i] = within_rule_bounds(MATCH_SQUARE, area, bounds)
+        else:
+            out_code[i] = within_rule_bounds(MATCH_RECTANGLE, area, bounds)
+
+@njit(KERNEL_SIGNATURES["classify_curves"], cache=True, nogil=True)
+def classify_curves(curve_pts, bounds, out_code, out_area):
+    """Classify curve rows as ceiling light circles"""
+    for i in range(curve_pts.shape[0]):
+        p1x, p1y = curve_pts[i, 0], curve_pts[i, 1]
+        p2x, p2y = curve_pts[i, 2], curve_pts[i, 3]
+        p3x, p3y = curve_pts[i, 4], curve_pts[i, 5]
+        out_area[i] = 0.0
+        out_code[i] = MATCH_NONE
+        
+        if is_circle_xy(p1x, p1y, p2x, p2y, p3x, p3y):
+            area = circle_area_xy(p1x, p1y, p2x, p2y, p3x, p3y)
+            out_area[i] = area
+            out_code[i] = within_rule_bounds(MATCH_CIRCLE, area, bounds)
+
+@njit(KERNEL_SIGNATURES["classify_lines"], cache=True, nogil=True)
+def classify_lines(line_pts, bounds, out_code, out_area):
+    """Classify line rows of non-zero length; line length is used as pseudo-area"""
+    for i in range(line_pts.shape[0]):
+        length = math.sqrt(dist_sq_xy(line_pts[i, 0], line_pts[i, 1], line_pts[i, 2], line_pts[i, 3]))
+        out_area[i] = length
+        out_code[i] = within_rule_bounds(MATCH_LINE, length, bounds)
\ No newline at end of file
@@ -0,0 +1,15 @@
+"""
+Source fingerprint of geometry_kernels.py
+Kept free of numba so main.py can validate a prebuilt installation_kernels module
+without importing (and JIT-compiling) the kernels themselves
+"""
+import hashlib
+import os
+
+KERNELS_SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geometry_kernels.py")
+
+def kernels_source_hash() -> int:
+    """Hash of geometry_kernels.py as a non-negative int64, embedded in the AOT build"""
+    with open(KERNELS_SOURCE_PATH, "rb") as f:
+        digest = hashlib.sha256(f.read()).digest()
+    return int.from_bytes(digest[:8], "big") >> 1
\ No newline at end of file
@@ -3,18 +3,63 @@ Installation API - Detects installation symbols from extracted vector data
 Implements knowledge base rules (Rule 5.6, 8.1-8.4) for installation detection
 Identifies electrical outlets, switches, lighting points, and other installation elements
 """
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+import msgspec
+import asyncio
+from enum import IntEnum
 import logging
 import math
+import numpy as np
 import re
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+from kernel_version import kernels_source_hash
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("installation_api")
 
+def _load_geometry_kernels() -> tuple:
+    """
+    Load the classification kernels
+    
+    Prefers the ahead-of-time compiled installation_kernels module (python build_kernels.py),
+    which needs no JIT compilation at startup but holds the GIL while running. Falls back to
+    the Numba JIT kernels in geometry_kernels when the module is missing or was built from
+    an older geometry_kernels.py.
+    
+    Returns:
+        (classify_rects, classify_curves, classify_lines)
+    """
+    try:
+        import installation_kernels
+    except ImportError:
+        installation_kernels = None
+    
+    if installation_kernels is not None:
+        built_hash = getattr(installation_kernels, "kernels_source_hash", None)
+        if built_hash is not None and built_hash() == kernels_source_hash():
+            logger.info("Using AOT-compiled geometry kernels (installation_kernels); "
+                        "they hold the GIL, so pages do not overlap inside them")
+            return (installation_kernels.classify_rects,
+                    installation_kernels.classify_curves,
+                    installation_kernels.classify_lines)
+        logger.warning("installation_kernels was built from an older geometry_kernels.py; "
+                       "rerun python build_kernels.py. Falling back to JIT kernels")
+    
+    import geometry_kernels
+    logger.info("Using Numba JIT geometry kernels (geometry_kernels)")
+    return geometry_kernels.classify_rects, geometry_kernels.classify_curves, geometry_kernels.classify_lines
+
+classify_rects, classify_curves, classify_lines = _load_geometry_kernels()
+
 # Knowledge Base - Installation Symbol Patterns (Rules 5.6, 8.1-8.3)
 INSTALLATION_PATTERNS = {
     "WCD": ["WCD", "STOPCONTACT", "OUTLET", "SOCKET", "WANDCONTACTDOOS"],
@@ -33,6 +78,38 @@ INSTALLATION_PATTERNS = {
     "PV": ["PV", "SOLAR", "ZONNEPANEEL", "SOLARPANEL"]
 }
 
+# Cheap prescreens: texts shorter than the shortest keyword, or sharing no character with
+# any keyword's first character, cannot match
+MIN_KEYWORD_LENGTH = min(len(keyword) for keywords in INSTALLATION_PATTERNS.values() for keyword in keywords)
+KEYWORD_FIRST_CHARS = frozenset(
+    keyword[0].upper() for keywords in INSTALLATION_PATTERNS.values() for keyword in keywords
+)
+
+# Integer ids for installation types, in INSTALLATION_PATTERNS order (WCD=0, LICHTPUNT=1, ...)
+InstallationType = IntEnum("InstallationType", list(INSTALLATION_PATTERNS), start=0)
+
+# Uppercased keyword tuples, computed once so matching never re-uppercases a keyword
+INSTALLATION_PATTERNS_UPPER = {
+    install_type: tuple(keyword.upper() for keyword in keywords)
+    for install_type, keywords in INSTALLATION_PATTERNS.items()
+}
+
+# Single automaton over all keywords, built once at import; values are the keyword's InstallationType.
+# Without pyahocorasick, fall back to one precompiled alternation regex per installation type.
+KEYWORD_AUTOMATON = None
+KEYWORD_REGEXES = {}
+if ahocorasick is not None:
+    KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _install_type, _keywords in INSTALLATION_PATTERNS_UPPER.items():
+        for _keyword in _keywords:
+            KEYWORD_AUTOMATON.add_word(_keyword, InstallationType[_install_type])
+    KEYWORD_AUTOMATON.make_automaton()
+else:
+    KEYWORD_REGEXES = {
+        InstallationType[install_type]: re.compile("|".join(re.escape(keyword) for keyword in keywords))
+        for install_type, keywords in INSTALLATION_PATTERNS_UPPER.items()
+    }
+
 # Mapping from installation type to standardized codes and labels (Rule 3.1)
 INSTALLATION_MAPPING = {
     "WCD": {
@@ -121,38 +198,85 @@ INSTALLATION_MAPPING = {
     }
 }
 
+# Prebuilt output symbols per InstallationType, copied and filled in per detection.
+# All keys are present up front (None placeholders) so a copy never resizes and the
+# output key order is fixed.
+TEXT_SYMBOL_TEMPLATES = tuple(
+    {
+        "type": install_type.name,
+        **INSTALLATION_MAPPING[install_type.name],
+        "position": None,
+        "text": None,
+        "bbox": None,
+        "confidence": 1.0,
+        "reason": f"Text contains {install_type.name} keyword",
+        "source": "text"
+    }
+    for install_type in InstallationType
+)
+
+GEOMETRIC_SYMBOL_TEMPLATES = tuple(
+    {
+        "type": install_type.name,
+        **INSTALLATION_MAPPING[install_type.name],
+        "position": None,
+        "bbox": None,
+        "confidence": None,
+        "reason": None,
+        "source": "geometric_pattern",
+        "shape": None
+    }
+    for install_type in InstallationType
+)
+
 app = FastAPI(
     title="Installation Symbol Detection API",
     description="Detects installation symbols from extracted vector data",
     version="1.0.0",
 )
 
-class TextItem(BaseModel):
+# Request schema - msgspec structs give fixed-slot attribute access (point.x instead of
+# point["x"]) and are decoded straight from JSON in C
+class Point(msgspec.Struct, gc=False):
+    x: float
+    y: float
+
+class BBox(msgspec.Struct, gc=False):
+    x0: float
+    y0: float
+    x1: float
+    y1: float
+
+class Rect(BBox):
+    width: float
+    height: float
+
+class TextItem(msgspec.Struct, kw_only=True):
     text: str
-    position: Dict[str, float]
+    position: Point
     font_size: float
     font_name: str
-    color: List[float] = [0, 0, 0]
-    bbox: Dict[str, float]
+    color: List[float] = msgspec.field(default_factory=lambda: [0, 0, 0])
+    bbox: BBox
 
-class DrawingItem(BaseModel):
+class DrawingItem(msgspec.Struct, kw_only=True):
     type: str
-    p1: Optional[Dict[str, float]] = None
-    p2: Optional[Dict[str, float]] = None
-    p3: Optional[Dict[str, float]] = None
-    rect: Optional[Dict[str, float]] = None
+    p1: Optional[Point] = None
+    p2: Optional[Point] = None
+    p3: Optional[Point] = None
+    rect: Optional[Rect] = None
     length: Optional[float] = None
-    color: List[float] = [0, 0, 0]
+    color: List[float] = msgspec.field(default_factory=lambda: [0, 0, 0])
     width: Optional[float] = 1.0
     area: Optional[float] = None
-    fill: List[Any] = []
+    fill: List[Any] = msgspec.field(default_factory=list)
 
-class Drawings(BaseModel):
+class Drawings(msgspec.Struct):
     lines: List[DrawingItem]
     rectangles: List[DrawingItem]
     curves: List[DrawingItem]
 
-class PageData(BaseModel):
+class PageData(msgspec.Struct, kw_only=True):
     page_number: int
     page_size: Dict[str, float]
     drawings: Drawings
@@ -160,358 +284,390 @@ class PageData(BaseModel):
     is_vector: bool = True
     processing_time_ms: Optional[int] = None
 
-class InstallationDetectionRequest(BaseModel):
+class InstallationDetectionRequest(msgspec.Struct):
     pages: List[PageData]
 
-class InstallationDetectionResponse(BaseModel):
-    pages: List[Dict[str, Any]]
+# Reusable decoder; resolves the request schema once instead of on every call.
+# strict=False keeps pydantic's lax coercions, e.g. 2.0 for an int or "8" for a float
+REQUEST_DECODER = msgspec.json.Decoder(InstallationDetectionRequest, strict=False)
+
+# The endpoint reads the raw body, so FastAPI cannot infer its schema; describe it from
+# the structs instead, with the nested struct schemas registered as OpenAPI components
+(REQUEST_BODY_SCHEMA,), REQUEST_SCHEMA_COMPONENTS = msgspec.json.schema_components(
+    [InstallationDetectionRequest], ref_template="#/components/schemas/{name}"
+)
+REQUEST_BODY_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/json": {"schema": REQUEST_BODY_SCHEMA}}
+    }
+}
+
+_default_openapi = app.openapi
+
+def openapi_with_request_schemas() -> Dict[str, Any]:
+    """Generate the OpenAPI schema once, adding the msgspec request struct components"""
+    if app.openapi_schema is None:
+        schema = _default_openapi()
+        schema.setdefault("components", {}).setdefault("schemas", {}).update(REQUEST_SCHEMA_COMPONENTS)
+    return app.openapi_schema
+
+app.openapi = openapi_with_request_schemas
+
+# Response symbols are plain dicts holding Point/BBox structs, which msgspec encodes natively
+RESPONSE_ENCODER = msgspec.json.Encoder()
+
+# msgspec reports the failing field as a JSONPath suffix, e.g. " - at `$.pages[0].page_number`"
+DECODE_ERROR_PATH = re.compile(r" - at `\$(.*)`$")
+DECODE_ERROR_PATH_PART = re.compile(r"\.([^.\[]+)|\[([^\]]*)\]")
+
+def decode_error_details(error: msgspec.DecodeError) -> List[Dict[str, Any]]:
+    """Convert a msgspec decode error to FastAPI's validation error list ({type, loc, msg})"""
+    message = str(error)
+    loc: List[Any] = ["body"]
+    match = DECODE_ERROR_PATH.search(message)
+    if match:
+        message = message[:match.start()]
+        for name, index in DECODE_ERROR_PATH_PART.findall(match.group(1)):
+            loc.append(name if name else int(index) if index.isdigit() else index)
+    error_type = "value_error" if isinstance(error, msgspec.ValidationError) else "json_invalid"
+    return [{"type": error_type, "loc": loc, "msg": message}]
+
+# Geometric symbols closer than this to a symbol of the same type are treated as duplicates
+DUPLICATE_DISTANCE = 20
+
+# Per-page drawing arrays, one row per item:
+#   rectangles: x0, y0, x1, y1, width, height
+#   curves:     p1x, p1y, p2x, p2y, p3x, p3y
+#   lines:      p1x, p1y, p2x, p2y
+RECT_COLUMNS = 6
+CURVE_COLUMNS = 6
+LINE_COLUMNS = 4
+
+# Shapes by the match codes emitted by the classification kernels
+GEOMETRIC_MATCH_SHAPES = (None, "circle", "square", "rectangle", "line")
+
+# Geometric pattern rules per shape: (min_area, max_area, min_exclusive, type, confidence, reason).
+# max_area is inclusive; min_area is inclusive unless min_exclusive is set ("area > min_area").
+# The first matching rule wins.
+GEOMETRIC_RULES = {
+    "circle": (
+        (10, 50, False, InstallationType.LICHTPUNT, 0.7, "Circle pattern typical for ceiling light"),
+    ),
+    "square": (
+        (4, 25, False, InstallationType.WCD, 0.7, "Small square pattern typical for electrical outlet"),
+    ),
+    "rectangle": (
+        (4, 36, False, InstallationType.SCHAKELAAR, 0.6, "Small rectangle pattern typical for switch"),
+    ),
+    "line": (
+        (0, math.inf, True, InstallationType.WATERTAP, 0.5, "Line pattern that may represent water installation"),
+    ),
+}
+
+def _rule_band(rules: tuple) -> tuple:
+    """Overall (min_area, max_area, min_exclusive) band covered by a shape's rules"""
+    min_area = min(rule[0] for rule in rules)
+    min_exclusive = all(rule[2] for rule in rules if rule[0] == min_area)
+    return min_area, max(rule[1] for rule in rules), float(min_exclusive)
+
+# Overall band of each shape's rules, indexed by match code, so the kernels can drop
+# non-matching rows without knowing the individual rules
+GEOMETRIC_RULE_BOUNDS = np.array(
+    [(math.inf, -math.inf, 0.0)] + [_rule_band(GEOMETRIC_RULES[shape]) for shape in GEOMETRIC_MATCH_SHAPES[1:]],
+    dtype=np.float64
+)
 
 # Utility functions
-def distance(p1: dict, p2: dict) -> float:
-    """Calculate distance between two points"""
-    return math.sqrt((p2['x'] - p1['x'])**2 + (p2['y'] - p1['y'])**2)
-
-def is_circle(item: dict) -> bool:
-    """Check if a curve item forms a circle"""
-    if item["type"] != "curve" or not item.get("p1") or not item.get("p2") or not item.get("p3"):
-        return False
-    
-    # For a circle, the three points should be approximately equidistant from center
-    center_x = (item["p1"]["x"] + item["p2"]["x"] + item["p3"]["x"]) / 3
-    center_y = (item["p1"]["y"] + item["p2"]["y"] + item["p3"]["y"]) / 3
-    
-    center = {"x": center_x, "y": center_y}
+def dist_sq(p1: Point, p2: Point) -> float:
+    """Calculate squared distance between two points, for threshold comparisons"""
+    dx = p2.x - p1.x
+    dy = p2.y - p1.y
+    return dx * dx + dy * dy
+
+def classify_drawings(kernel, arr: np.ndarray) -> tuple:
+    """Run a classification kernel over a per-page drawing array, returning (codes, areas)"""
+    codes = np.empty(arr.shape[0], dtype=np.int64)
+    areas = np.empty(arr.shape[0], dtype=np.float64)
+    kernel(arr, GEOMETRIC_RULE_BOUNDS, codes, areas)
+    return codes, areas
+
+def _curve_coords(item: DrawingItem) -> tuple:
+    """Flatten curve control points to (p1x, p1y, p2x, p2y, p3x, p3y)"""
+    return (item.p1.x, item.p1.y, item.p2.x, item.p2.y, item.p3.x, item.p3.y)
+
+def _grid_cell(position: Point) -> tuple:
+    """Spatial grid cell of a position, cells are DUPLICATE_DISTANCE wide"""
+    return int(position.x // DUPLICATE_DISTANCE), int(position.y // DUPLICATE_DISTANCE)
+
+def add_to_position_grid(grid: dict, symbol_type: int, position: Point) -> None:
+    """Register a symbol position in the per-type spatial grid"""
+    cx, cy = _grid_cell(position)
+    grid.setdefault((symbol_type, cx, cy), []).append(position)
+
+def has_nearby_symbol(grid: dict, symbol_type: int, position: Point) -> bool:
+    """Check if a symbol of the same type lies within DUPLICATE_DISTANCE of position"""
+    cx, cy = _grid_cell(position)
+    max_dist_sq = DUPLICATE_DISTANCE * DUPLICATE_DISTANCE
     
-    d1 = distance(center, item["p1"])
-    d2 = distance(center, item["p2"])
-    d3 = distance(center, item["p3"])
+    # Anything closer than one cell width can only be in the 3x3 neighbourhood
+    for gx in (cx - 1, cx, cx + 1):
+        for gy in (cy - 1, cy, cy + 1):
+            for existing in grid.get((symbol_type, gx, gy), ()):
+                if dist_sq(existing, position) < max_dist_sq:
+                    return True
     
-    # Calculate average distance and check if all points are close to it
-    avg_dist = (d1 + d2 + d3) / 3
-    tolerance = 0.2  # 20% tolerance
+    return False
+
+def match_installation_types(text_upper: str) -> set:
+    """Find all installation types with a keyword in an uppercased text, each type once"""
+    if KEYWORD_AUTOMATON is not None:
+        # Several keywords of one type (e.g. "TV ANTENNE") collapse into a single entry
+        return {symbol_type for _, symbol_type in KEYWORD_AUTOMATON.iter(text_upper)}
     
-    return (abs(d1 - avg_dist) / avg_dist < tolerance and
-            abs(d2 - avg_dist) / avg_dist < tolerance and
-            abs(d3 - avg_dist) / avg_dist < tolerance)
+    return {symbol_type for symbol_type, pattern in KEYWORD_REGEXES.items() if pattern.search(text_upper)}
 
 def find_installation_type_from_text(text: str) -> str:
     """Determine installation type from text using patterns"""
     text_upper = text.upper()
     
-    for install_type, patterns in INSTALLATION_PATTERNS.items():
+    for install_type, patterns in INSTALLATION_PATTERNS_UPPER.items():
         for pattern in patterns:
-            if pattern.upper() in text_upper:
+            if pattern in text_upper:
                 return install_type
     
     return None
 
-def get_symbol_shape(item: dict) -> str:
-    """Determine symbol shape from drawing item"""
-    if item["type"] == "rect":
-        rect = item["rect"]
-        width = rect["width"]
-        height = rect["height"]
-        
-        # Square-like (aspect ratio close to 1)
-        if 0.8 <= width / height <= 1.2:
-            return "square"
-        else:
-            return "rectangle"
-    
-    elif item["type"] == "curve" and is_circle(item):
-        return "circle"
-    
-    elif item["type"] == "line":
-        return "line"
-    
-    return "unknown"
-
 def is_geometric_pattern_match(shape: str, area: float) -> Dict[str, Any]:
     """Match geometric pattern to installation type"""
-    if shape == "circle" and 10 <= area <= 50:
-        return {
-            "type": "LICHTPUNT",
-            "confidence": 0.7,
-            "reason": "Circle pattern typical for ceiling light"
-        }
-    
-    elif shape == "square" and 4 <= area <= 25:
-        return {
-            "type": "WCD",
-            "confidence": 0.7,
-            "reason": "Small square pattern typical for electrical outlet"
-        }
-    
-    elif shape == "rectangle" and 4 <= area <= 36 and area > 0:
-        return {
-            "type": "SCHAKELAAR",
-            "confidence": 0.6,
-            "reason": "Small rectangle pattern typical for switch"
-        }
-    
-    elif shape == "line" and area > 0:
-        return {
-            "type": "WATERTAP",
-            "confidence": 0.5,
-            "reason": "Line pattern that may represent water installation"
-        }
+    for min_area, max_area, min_exclusive, install_type, confidence, reason in GEOMETRIC_RULES.get(shape, ()):
+        if (min_area < area if min_exclusive else min_area <= area) and area <= max_area:
+            return {
+                "type": install_type,
+                "confidence": confidence,
+                "reason": reason
+            }
     
     return None
 
-def calc_item_area(item: dict) -> float:
-    """Calculate area of a drawing item"""
-    if item["type"] == "rect" and "rect" in item:
-        rect = item["rect"]
-        return rect["width"] * rect["height"]
-    
-    elif item["type"] == "curve" and is_circle(item):
-        # Estimate circle area
-        center_x = (item["p1"]["x"] + item["p2"]["x"] + item["p3"]["x"]) / 3
-        center_y = (item["p1"]["y"] + item["p2"]["y"] + item["p3"]["y"]) / 3
-        
-        center = {"x": center_x, "y": center_y}
-        radius = distance(center, item["p1"])
-        
-        return math.pi * (radius ** 2)
-    
-    elif item["type"] == "line" and "p1" in item and "p2" in item:
-        # Just return line length as pseudo-area
-        return distance(item["p1"], item["p2"])
-    
-    return 0
-
-@app.post("/detect-installations/", response_model=InstallationDetectionResponse)
-async def detect_installations(request: InstallationDetectionRequest):
+@app.post("/detect-installations/", response_model=None, openapi_extra=REQUEST_BODY_OPENAPI)
+async def detect_installations(raw_request: Request):
     """
     Detect installation symbols from extracted vector data
     
     Args:
-        request: JSON with pages containing drawings and texts
+        raw_request: HTTP request whose JSON body holds pages containing drawings and texts
         
     Returns:
         JSON with detected installation symbols for each page
     """
+    # Decode the raw body straight into msgspec structs, bypassing FastAPI's pydantic validation
+    try:
+        request = REQUEST_DECODER.decode(await raw_request.body())
+    except msgspec.DecodeError as e:
+        # Same 422 body shape FastAPI uses for its own validation errors: {"detail": [...]}
+        raise RequestValidationError(decode_error_details(e))
+    
     try:
-        logger.info(f"Detecting installation symbols for {len(request.pages)} pages")
+        logger.info("Detecting installation symbols for %d pages", len(request.pages))
         
-        results = []
+        # Keyword matches per uppercased text, shared by all pages of this request
+        text_cache = {}
         
-        for page_data in request.pages:
-            logger.info(f"Analyzing installation symbols on page {page_data.page_number}")
-            
-            symbols = _extract_installation_symbols(page_data)
-            
-            results.append({
-                "page_number": page_data.page_number,
-                "symbols": symbols
-            })
+        # Pages are independent; analyze them concurrently in the default threadpool.
+        # The JIT geometry kernels release the GIL, so pages overlap for real.
+        results = await asyncio.gather(
+            *(asyncio.to_thread(_detect_page_installations, page_data, text_cache)
+              for page_data in request.pages)
+        )
         
-        logger.info(f"Successfully detected installation symbols for {len(results)} pages")
-        return {"pages": results}
+        logger.info("Successfully detected installation symbols for %d pages", len(results))
+        # Encode in C with msgspec instead of walking the payload with jsonable_encoder
+        return Response(content=RESPONSE_ENCODER.encode({"pages": results}), media_type="application/json")
         
     except Exception as e:
         logger.error(f"Error detecting installation symbols: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
-def _extract_installation_symbols(page_data: PageData) -> List[Dict[str, Any]]:
+def _detect_page_installations(page_data: PageData, text_cache: Optional[dict] = None) -> Dict[str, Any]:
+    """Detect installation symbols on a single page, run in a worker thread"""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Analyzing installation symbols on page %d", page_data.page_number)
+    
+    return {
+        "page_number": page_data.page_number,
+        "symbols": _extract_installation_symbols(page_data, text_cache)
+    }
+
+def _extract_installation_symbols(page_data: PageData, text_cache: Optional[dict] = None) -> List[Dict[str, Any]]:
     """
     Extract installation symbols using rule-based approach
     
     Args:
         page_data: Page data containing drawings and texts
+        text_cache: Optional uppercased text -> matched installation types cache, reused
+            across pages so repeated labels ("WCD", "WCD", ...) are only matched once
         
     Returns:
         List of detected installation symbols with properties
     """
+    if text_cache is None:
+        text_cache = {}
+    
     symbols = []
+    # Positions of emitted symbols, bucketed by (type, cell) for duplicate lookups
+    position_grid = {}
     
     # Step 1: Detect installations from text labels (Rules 5.6, 8.1-8.3)
-    logger.info("Detecting installations from text labels...")
+    debug = logger.isEnabledFor(logging.DEBUG)
+    if debug:
+        logger.debug("Detecting installations from text labels...")
     for text_item in page_data.texts:
-        text_dict = text_item.dict()
-        text_upper = text_dict["text"].upper()
+        # Skip single characters, tick marks etc. before doing any string work
+        if len(text_item.text) < MIN_KEYWORD_LENGTH:
+            continue
+        
+        text_upper = text_item.text.upper()
+        if KEYWORD_FIRST_CHARS.isdisjoint(text_upper):
+            continue
+        
+        # Search for installation symbols in text, once per distinct text
+        matched_types = text_cache.get(text_upper)
+        if matched_types is None:
+            matched_types = tuple(sorted(match_installation_types(text_upper)))
+            text_cache[text_upper] = matched_types
+        if not matched_types:
+            continue
         
-        # Search for installation symbols in text
-        for symbol_type, keywords in INSTALLATION_PATTERNS.items():
-            if any(keyword.upper() in text_upper for keyword in keywords):
-                # Create installation symbol
-                symbol_info = INSTALLATION_MAPPING.get(symbol_type, {
-                    "label_code": "UNKNOWN",
-                    "label_type": "installation",
-                    "label_nl": "Onbekende_installatie",
-                    "label_en": "Unknown_installation"
-                })
-                
-                symbols.append({
-                    "type": symbol_type,
-                    "label_code": symbol_info["label_code"],
-                    "label_type": symbol_info["label_type"],
-                    "label_nl": symbol_info["label_nl"],
-                    "label_en": symbol_info["label_en"],
-                    "position": {
-                        "x": (text_dict["bbox"]["x0"] + text_dict["bbox"]["x1"]) / 2,
-                        "y": (text_dict["bbox"]["y0"] + text_dict["bbox"]["y1"]) / 2
-                    },
-                    "text": text_dict["text"],
-                    "bbox": text_dict["bbox"],
-                    "confidence": 1.0,
-                    "reason": f"Text contains {symbol_type} keyword",
-                    "source": "text"
-                })
-                
-                # Don't break here - some texts may contain multiple installation references
+        position = Point(
+            (text_item.bbox.x0 + text_item.bbox.x1) / 2,
+            (text_item.bbox.y0 + text_item.bbox.y1) / 2
+        )
+        
+        for symbol_type in matched_types:
+            # Create installation symbol
+            symbol = TEXT_SYMBOL_TEMPLATES[symbol_type].copy()
+            symbol["position"] = position
+            symbol["text"] = text_item.text
+            symbol["bbox"] = text_item.bbox
+            symbols.append(symbol)
+            add_to_position_grid(position_grid, symbol_type, position)
+            
+            # Don't break here - some texts may contain multiple installation references,
+            # but each installation type is emitted at most once per text
     
     # Step 2: Detect installations from geometric patterns
-    logger.info("Detecting installations from geometric patterns...")
+    if debug:
+        logger.debug("Detecting installations from geometric patterns...")
+    
+    # Each drawing class is packed into one array and classified by a compiled
+    # kernel; only the (few) matching rows are walked in Python below
+    rects = [r for r in page_data.drawings.rectangles if r.type == "rect" and r.rect is not None]
+    rect_arr = np.array(
+        [(r.rect.x0, r.rect.y0, r.rect.x1, r.rect.y1, r.rect.width, r.rect.height) for r in rects],
+        dtype=np.float64
+    ).reshape(-1, RECT_COLUMNS)
+    rect_codes, rect_areas = classify_drawings(classify_rects, rect_arr)
+    
+    curves = [c for c in page_data.drawings.curves if c.type == "curve" and c.p1 and c.p2 and c.p3]
+    curve_pts = np.array([_curve_coords(c) for c in curves], dtype=np.float64).reshape(-1, CURVE_COLUMNS)
+    curve_codes, curve_areas = classify_drawings(classify_curves, curve_pts)
+    
+    lines = [ln for ln in page_data.drawings.lines if ln.type == "line" and ln.p1 is not None and ln.p2 is not None]
+    line_pts = np.array(
+        [(ln.p1.x, ln.p1.y, ln.p2.x, ln.p2.y) for ln in lines],
+        dtype=np.float64
+    ).reshape(-1, LINE_COLUMNS)
+    line_codes, line_areas = classify_drawings(classify_lines, line_pts)
     
     # Process rectangles
-    for rect in page_data.drawings.rectangles:
-        rect_dict = rect.dict()
-        shape = get_symbol_shape(rect_dict)
-        area = calc_item_area(rect_dict)
+    for i in np.flatnonzero(rect_codes):
+        rect = rects[i]
+        shape = GEOMETRIC_MATCH_SHAPES[rect_codes[i]]
         
-        pattern_match = is_geometric_pattern_match(shape, area)
+        pattern_match = is_geometric_pattern_match(shape, float(rect_areas[i]))
         if pattern_match:
             # Create position from rectangle center
-            position = {
-                "x": (rect_dict["rect"]["x0"] + rect_dict["rect"]["x1"]) / 2,
-                "y": (rect_dict["rect"]["y0"] + rect_dict["rect"]["y1"]) / 2
-            }
+            position = Point(
+                (rect.rect.x0 + rect.rect.x1) / 2,
+                (rect.rect.y0 + rect.rect.y1) / 2
+            )
             
             # Check if we already have a text-based symbol at this position
-            duplicate = False
-            for existing in symbols:
-                if (distance(existing["position"], position) < 20 and 
-                    existing["type"] == pattern_match["type"]):
-                    duplicate = True
-                    break
-            
-            if not duplicate:
-                symbol_info = INSTALLATION_MAPPING.get(pattern_match["type"], {
-                    "label_code": "UNKNOWN",
-                    "label_type": "installation",
-                    "label_nl": "Onbekende_installatie",
-                    "label_en": "Unknown_installation"
-                })
-                
-                symbols.append({
-                    "type": pattern_match["type"],
-                    "label_code": symbol_info["label_code"],
-                    "label_type": symbol_info["label_type"],
-                    "label_nl": symbol_info["label_nl"],
-                    "label_en": symbol_info["label_en"],
-                    "position": position,
-                    "bbox": rect_dict["rect"],
-                    "confidence": pattern_match["confidence"],
-                    "reason": pattern_match["reason"],
-                    "source": "geometric_pattern",
-                    "shape": shape
-                })
+            if not has_nearby_symbol(position_grid, pattern_match["type"], position):
+                symbol = GEOMETRIC_SYMBOL_TEMPLATES[pattern_match["type"]].copy()
+                symbol["position"] = position
+                symbol["bbox"] = rect.rect
+                symbol["confidence"] = pattern_match["confidence"]
+                symbol["reason"] = pattern_match["reason"]
+                symbol["shape"] = shape
+                symbols.append(symbol)
+                add_to_position_grid(position_grid, pattern_match["type"], position)
     
     # Process curves (circles)
-    for curve in page_data.drawings.curves:
-        curve_dict = curve.dict()
-        shape = get_symbol_shape(curve_dict)
-        area = calc_item_area(curve_dict)
+    for i in np.flatnonzero(curve_codes):
+        curve = curves[i]
+        shape = GEOMETRIC_MATCH_SHAPES[curve_codes[i]]
         
-        pattern_match = is_geometric_pattern_match(shape, area)
+        pattern_match = is_geometric_pattern_match(shape, float(curve_areas[i]))
         if pattern_match:
             # Create position from curve center
-            position = {
-                "x": (curve_dict["p1"]["x"] + curve_dict["p2"]["x"] + curve_dict["p3"]["x"]) / 3,
-                "y": (curve_dict["p1"]["y"] + curve_dict["p2"]["y"] + curve_dict["p3"]["y"]) / 3
-            }
+            position = Point(
+                (curve.p1.x + curve.p2.x + curve.p3.x) / 3,
+                (curve.p1.y + curve.p2.y + curve.p3.y) / 3
+            )
             
             # Check if we already have a text-based symbol at this position
-            duplicate = False
-            for existing in symbols:
-                if (distance(existing["position"], position) < 20 and 
-                    existing["type"] == pattern_match["type"]):
-                    duplicate = True
-                    break
-            
-            if not duplicate:
-                symbol_info = INSTALLATION_MAPPING.get(pattern_match["type"], {
-                    "label_code": "UNKNOWN",
-                    "label_type": "installation",
-                    "label_nl": "Onbekende_installatie",
-                    "label_en": "Unknown_installation"
-                })
-                
-                symbols.append({
-                    "type": pattern_match["type"],
-                    "label_code": symbol_info["label_code"],
-                    "label_type": symbol_info["label_type"],
-                    "label_nl": symbol_info["label_nl"],
-                    "label_en": symbol_info["label_en"],
-                    "position": position,
-                    "bbox": {
-                        "x0": min(curve_dict["p1"]["x"], curve_dict["p2"]["x"], curve_dict["p3"]["x"]),
-                        "y0": min(curve_dict["p1"]["y"], curve_dict["p2"]["y"], curve_dict["p3"]["y"]),
-                        "x1": max(curve_dict["p1"]["x"], curve_dict["p2"]["x"], curve_dict["p3"]["x"]),
-                        "y1": max(curve_dict["p1"]["y"], curve_dict["p2"]["y"], curve_dict["p3"]["y"])
-                    },
-                    "confidence": pattern_match["confidence"],
-                    "reason": pattern_match["reason"],
-                    "source": "geometric_pattern",
-                    "shape": shape
-                })
+            if not has_nearby_symbol(position_grid, pattern_match["type"], position):
+                symbol = GEOMETRIC_SYMBOL_TEMPLATES[pattern_match["type"]].copy()
+                symbol["position"] = position
+                symbol["bbox"] = {
+                    "x0": min(curve.p1.x, curve.p2.x, curve.p3.x),
+                    "y0": min(curve.p1.y, curve.p2.y, curve.p3.y),
+                    "x1": max(curve.p1.x, curve.p2.x, curve.p3.x),
+                    "y1": max(curve.p1.y, curve.p2.y, curve.p3.y)
+                }
+                symbol["confidence"] = pattern_match["confidence"]
+                symbol["reason"] = pattern_match["reason"]
+                symbol["shape"] = shape
+                symbols.append(symbol)
+                add_to_position_grid(position_grid, pattern_match["type"], position)
     
     # Process lines for water installations or other linear elements
-    for line in page_data.drawings.lines:
-        line_dict = line.dict()
-        shape = get_symbol_shape(line_dict)
-        area = calc_item_area(line_dict)
+    for i in np.flatnonzero(line_codes):
+        line = lines[i]
+        shape = GEOMETRIC_MATCH_SHAPES[line_codes[i]]
         
-        pattern_match = is_geometric_pattern_match(shape, area)
-        if pattern_match and pattern_match["type"] in ["WATERTAP", "DRAIN"]:
+        pattern_match = is_geometric_pattern_match(shape, float(line_areas[i]))
+        if pattern_match and pattern_match["type"] in (InstallationType.WATERTAP, InstallationType.DRAIN):
             # Create position from line midpoint
-            position = {
-                "x": (line_dict["p1"]["x"] + line_dict["p2"]["x"]) / 2,
-                "y": (line_dict["p1"]["y"] + line_dict["p2"]["y"]) / 2
-            }
+            position = Point(
+                (line.p1.x + line.p2.x) / 2,
+                (line.p1.y + line.p2.y) / 2
+            )
             
             # Check if we already have a text-based symbol at this position
-            duplicate = False
-            for existing in symbols:
-                if (distance(existing["position"], position) < 20 and 
-                    existing["type"] == pattern_match["type"]):
-                    duplicate = True
-                    break
-            
-            if not duplicate:
-                symbol_info = INSTALLATION_MAPPING.get(pattern_match["type"], {
-                    "label_code": "UNKNOWN",
-                    "label_type": "installation",
-                    "label_nl": "Onbekende_installatie",
-                    "label_en": "Unknown_installation"
-                })
-                
-                symbols.append({
-                    "type": pattern_match["type"],
-                    "label_code": symbol_info["label_code"],
-                    "label_type": symbol_info["label_type"],
-                    "label_nl": symbol_info["label_nl"],
-                    "label_en": symbol_info["label_en"],
-                    "position": position,
-                    "bbox": {
-                        "x0": min(line_dict["p1"]["x"], line_dict["p2"]["x"]),
-                        "y0": min(line_dict["p1"]["y"], line_dict["p2"]["y"]),
-                        "x1": max(line_dict["p1"]["x"], line_dict["p2"]["x"]),
-                        "y1": max(line_dict["p1"]["y"], line_dict["p2"]["y"])
-                    },
-                    "confidence": pattern_match["confidence"],
-                    "reason": pattern_match["reason"],
-                    "source": "geometric_pattern",
-                    "shape": shape
-                })
+            if not has_nearby_symbol(position_grid, pattern_match["type"], position):
+                symbol = GEOMETRIC_SYMBOL_TEMPLATES[pattern_match["type"]].copy()
+                symbol["position"] = position
+                symbol["bbox"] = {
+                    "x0": min(line.p1.x, line.p2.x),
+                    "y0": min(line.p1.y, line.p2.y),
+                    "x1": max(line.p1.x, line.p2.x),
+                    "y1": max(line.p1.y, line.p2.y)
+                }
+                symbol["confidence"] = pattern_match["confidence"]
+                symbol["reason"] = pattern_match["reason"]
+                symbol["shape"] = shape
+                symbols.append(symbol)
+                add_to_position_grid(position_grid, pattern_match["type"], position)
     
     # Step 3: Associate installation symbols with rooms
     # This would require room data which is not available here
     # In a full implementation, we would link each symbol to the room it's in
     
     if not symbols:
-        logger.warning(f"No installation symbols detected on page {page_data.page_number}")
+        logger.warning("No installation symbols detected on page %d", page_data.page_number)
         return [{
             "type": "unknown", 
             "label_code": "UNKNOWN",
@@ -522,7 +678,8 @@ def _extract_installation_symbols(page_data: PageData) -> List[Dict[str, Any]]:
             "confidence": 0.0
         }]
     
-    logger.info(f"Detected {len(symbols)} installation symbols")
+    if debug:
+        logger.debug("Detected %d installation symbols", len(symbols))
     return symbols
 
 @app.get("/")
@@ -547,5 +704,15 @@ async def health_check():
     }
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvloop/httptools (uvicorn[standard]) for the event loop and HTTP parsing; one worker
+    # per core since the symbol classifier is CPU-bound. Multiple workers need an import string.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=os.cpu_count() or 1
+    )
\ No newline at end of file
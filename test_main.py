@@ -0,0 +1,344 @@
+"""
+Tests for the geometry kernels and the detection endpoint
+
+The scalar_* helpers below restate the per-item shape rules the kernels replaced
+(get_symbol_shape, calc_item_area, is_circle, distance and the old
+is_geometric_pattern_match), so the kernels can be checked against them row by row.
+Where the scalar rules divided by zero (zero-height rectangles, curves whose points
+all coincide) the request used to fail; the kernels report no match instead.
+"""
+import math
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+# Scalar reference rules, returning (shape, installation type) or None
+def scalar_distance(x1: float, y1: float, x2: float, y2: float) -> float:
+    return math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+
+def scalar_pattern_match(shape: str, area: float):
+    if shape == "circle" and 10 <= area <= 50:
+        return shape, "LICHTPUNT"
+    elif shape == "square" and 4 <= area <= 25:
+        return shape, "WCD"
+    elif shape == "rectangle" and 4 <= area <= 36 and area > 0:
+        return shape, "SCHAKELAAR"
+    elif shape == "line" and area > 0:
+        return shape, "WATERTAP"
+    return None
+
+def scalar_rect_match(width: float, height: float):
+    if height == 0:
+        return None
+    shape = "square" if 0.8 <= width / height <= 1.2 else "rectangle"
+    return scalar_pattern_match(shape, width * height)
+
+def scalar_curve_match(p1x, p1y, p2x, p2y, p3x, p3y):
+    center_x = (p1x + p2x + p3x) / 3
+    center_y = (p1y + p2y + p3y) / 3
+    d1 = scalar_distance(center_x, center_y, p1x, p1y)
+    d2 = scalar_distance(center_x, center_y, p2x, p2y)
+    d3 = scalar_distance(center_x, center_y, p3x, p3y)
+    avg_dist = (d1 + d2 + d3) / 3
+    if avg_dist == 0:
+        return None
+    tolerance = 0.2
+    if not (abs(d1 - avg_dist) / avg_dist < tolerance and
+            abs(d2 - avg_dist) / avg_dist < tolerance and
+            abs(d3 - avg_dist) / avg_dist < tolerance):
+        return None
+    return scalar_pattern_match("circle", math.pi * (d1 ** 2))
+
+def scalar_line_match(p1x, p1y, p2x, p2y):
+    return scalar_pattern_match("line", scalar_distance(p1x, p1y, p2x, p2y))
+
+# Kernel results in the same (shape, installation type) form
+def kernel_matches(kernel, rows) -> list:
+    codes, areas = main.classify_drawings(kernel, np.asarray(rows, dtype=np.float64))
+    matches = []
+    for code, area in zip(codes, areas):
+        shape = main.GEOMETRIC_MATCH_SHAPES[code]
+        pattern_match = main.is_geometric_pattern_match(shape, float(area))
+        matches.append((shape, pattern_match["type"].name) if pattern_match else None)
+    return matches
+
+def rect_row(width: float, height: float) -> tuple:
+    return (0.0, 0.0, width, height, width, height)
+
+def circle_points(cx: float, cy: float, radius: float) -> tuple:
+    """Three points evenly spaced on a circle, so their centroid is the center"""
+    points = []
+    for k in range(3):
+        angle = 2 * math.pi * k / 3
+        points += [cx + radius * math.cos(angle), cy + radius * math.sin(angle)]
+    return tuple(points)
+
+@pytest.mark.parametrize("width, height", [
+    (2, 2), (5, 5), (5.01, 5), (1, 4), (4, 9), (6, 6), (6.01, 6), (1, 3.99),
+    (4, 5), (5, 4), (4, 3.2), (10, 0), (0, 10), (0, 0), (-3, -3),
+])
+def test_classify_rects_matches_scalar_rules(width, height):
+    assert kernel_matches(main.classify_rects, [rect_row(width, height)]) == [scalar_rect_match(width, height)]
+
+def test_classify_rects_area_boundaries():
+    # Squares match WCD for areas 4..25, rectangles match SCHAKELAAR for areas 4..36
+    assert kernel_matches(main.classify_rects, [
+        rect_row(2, 2), rect_row(5, 5), rect_row(1, 4), rect_row(4, 9), rect_row(4, 9.01), rect_row(1, 3.99),
+    ]) == [
+        ("square", "WCD"), ("square", "WCD"), ("rectangle", "SCHAKELAAR"),
+        ("rectangle", "SCHAKELAAR"), None, None,
+    ]
+
+def test_classify_rects_zero_height():
+    codes, areas = main.classify_drawings(main.classify_rects, np.array([rect_row(10, 0)]))
+    assert codes.tolist() == [0]
+    assert areas.tolist() == [0.0]
+
+@pytest.mark.parametrize("radius", [1.5, 1.78, 1.79, 2.5, 3.98, 3.99, 5])
+def test_classify_curves_matches_scalar_rules(radius):
+    points = circle_points(100, 100, radius)
+    assert kernel_matches(main.classify_curves, [points]) == [scalar_curve_match(*points)]
+
+def test_classify_curves_area_boundaries():
+    # Circles match LICHTPUNT for areas 10..50
+    assert kernel_matches(main.classify_curves, [
+        circle_points(0, 0, math.sqrt(9.99 / math.pi)),
+        circle_points(0, 0, math.sqrt(10.01 / math.pi)),
+        circle_points(0, 0, math.sqrt(49.99 / math.pi)),
+        circle_points(0, 0, math.sqrt(50.01 / math.pi)),
+    ]) == [None, ("circle", "LICHTPUNT"), ("circle", "LICHTPUNT"), None]
+
+def test_classify_curves_coincident_points():
+    codes, areas = main.classify_drawings(main.classify_curves, np.array([(7.0, 7.0, 7.0, 7.0, 7.0, 7.0)]))
+    assert codes.tolist() == [0]
+    assert areas.tolist() == [0.0]
+
+def test_classify_curves_non_circle():
+    points = (0.0, 0.0, 10.0, 0.0, 0.0, 1.0)
+    assert scalar_curve_match(*points) is None
+    assert kernel_matches(main.classify_curves, [points]) == [None]
+
+@pytest.mark.parametrize("points", [
+    (0, 0, 0, 0), (3, 4, 3, 4), (0, 0, 3, 4), (0, 0, 1e-9, 0), (-5, -5, 5, 5), (0, 0, 1000, 0),
+])
+def test_classify_lines_matches_scalar_rules(points):
+    assert kernel_matches(main.classify_lines, [points]) == [scalar_line_match(*points)]
+
+def test_classify_lines_zero_length():
+    codes, areas = main.classify_drawings(main.classify_lines, np.array([(3.0, 4.0, 3.0, 4.0)]))
+    assert codes.tolist() == [0]
+    assert areas.tolist() == [0.0]
+
+def test_line_rule_excludes_zero_length():
+    assert main.is_geometric_pattern_match("line", 0.0) is None
+    assert main.is_geometric_pattern_match("line", math.ulp(0.0))["type"] == main.InstallationType.WATERTAP
+    assert kernel_matches(main.classify_lines, [(0, 0, 0, 0), (0, 0, 1e-150, 0)]) == [None, ("line", "WATERTAP")]
+
+def test_kernels_match_scalar_rules_on_random_drawings():
+    rng = np.random.default_rng(0)
+    sizes = rng.choice([0.0, 1.0, 2.0, 4.0, 5.0, 6.0, 9.0], size=(500, 2)) + rng.uniform(-0.5, 0.5, size=(500, 2))
+    rects = [rect_row(width, height) for width, height in sizes]
+    assert kernel_matches(main.classify_rects, rects) == [scalar_rect_match(w, h) for *_, w, h in rects]
+
+    curves = rng.uniform(0, 8, size=(500, 6))
+    assert kernel_matches(main.classify_curves, curves) == [scalar_curve_match(*row) for row in curves]
+
+    lines = rng.integers(0, 3, size=(500, 4)).astype(np.float64)
+    assert kernel_matches(main.classify_lines, lines) == [scalar_line_match(*row) for row in lines]
+
+def drawing_rect(x0: float, y0: float, x1: float, y1: float) -> dict:
+    return {"type": "rect", "rect": {"x0": x0, "y0": y0, "x1": x1, "y1": y1, "width": x1 - x0, "height": y1 - y0}}
+
+def drawing_curve(points: tuple) -> dict:
+    return {
+        "type": "curve",
+        "p1": {"x": points[0], "y": points[1]},
+        "p2": {"x": points[2], "y": points[3]},
+        "p3": {"x": points[4], "y": points[5]},
+    }
+
+def drawing_line(x1: float, y1: float, x2: float, y2: float) -> dict:
+    return {"type": "line", "p1": {"x": x1, "y": y1}, "p2": {"x": x2, "y": y2}}
+
+FIXED_PAGE = {
+    "page_number": 1,
+    "page_size": {"width": 800.0, "height": 800.0},
+    "drawings": {
+        "rectangles": [
+            drawing_rect(102, 102, 106, 106),  # square next to the WCD label, a duplicate
+            drawing_rect(300, 300, 305, 305),  # square, area 25
+            drawing_rect(400, 400, 402, 410),  # rectangle, area 20
+            drawing_rect(500, 500, 510, 500),  # zero height
+        ],
+        "curves": [
+            drawing_curve(circle_points(200, 200, 3)),  # circle, area 9 * pi
+            drawing_curve((50, 50, 50, 50, 50, 50)),  # coincident points
+        ],
+        "lines": [
+            drawing_line(600, 600, 610, 600),
+            drawing_line(700, 700, 700, 700),  # zero length
+        ],
+    },
+    "texts": [
+        {
+            "text": "WCD 1",
+            "position": {"x": 100, "y": 100},
+            "font_size": 8.0,
+            "font_name": "Arial",
+            "bbox": {"x0": 100, "y0": 100, "x1": 110, "y1": 110},
+        },
+    ],
+}
+
+def test_detect_installations_fixed_page():
+    client = TestClient(main.app)
+    response = client.post("/detect-installations/", json={"pages": [FIXED_PAGE]})
+    assert response.status_code == 200
+
+    pages = response.json()["pages"]
+    assert [page["page_number"] for page in pages] == [1]
+    symbols = pages[0]["symbols"]
+    assert [(s["type"], s["source"], s.get("shape")) for s in symbols] == [
+        ("WCD", "text", None),
+        ("WCD", "geometric_pattern", "square"),
+        ("SCHAKELAAR", "geometric_pattern", "rectangle"),
+        ("LICHTPUNT", "geometric_pattern", "circle"),
+        ("WATERTAP", "geometric_pattern", "line"),
+    ]
+    assert [(s["position"]["x"], s["position"]["y"]) for s in symbols] == [
+        (105, 105), (302.5, 302.5), (401, 405), (pytest.approx(200), pytest.approx(200)), (605, 600),
+    ]
+    assert symbols[0]["text"] == "WCD 1"
+    assert symbols[0]["label_code"] == main.INSTALLATION_MAPPING["WCD"]["label_code"]
+    assert [s["confidence"] for s in symbols] == [1.0, 0.7, 0.6, 0.7, 0.5]
+    assert symbols[4]["bbox"] == {"x0": 600, "y0": 600, "x1": 610, "y1": 600}
+
+def test_detect_installations_invalid_body():
+    client = TestClient(main.app)
+    response = client.post("/detect-installations/", json={"pages": [{"page_number": "one"}]})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "pages", 0, "page_number"]
+def test_detect_installations_lax_numbers():
+    # Whole numbers sent as floats and numeric strings are coerced, as pydantic did
+    page = {
+        **FIXED_PAGE,
+        "page_number": 2.0,
+        "processing_time_ms": 12.0,
+        "texts": [{**FIXED_PAGE["texts"][0], "font_size": "8"}],
+    }
+    client = TestClient(main.app)
+    response = client.post("/detect-installations/", json={"pages": [page]})
+    assert response.status_code == 200
+    assert response.json()["pages"][0]["page_number"] == 2
+    assert response.json()["pages"][0]["symbols"][0]["text"] == "WCD 1"
+def test_detect_installations_openapi_request_body():
+    client = TestClient(main.app)
+    schema = client.get("/openapi.json").json()
+    request_body = schema["paths"]["/detect-installations/"]["post"]["requestBody"]
+    assert request_body["content"]["application/json"]["schema"] == {
+        "$ref": "#/components/schemas/InstallationDetectionRequest"
+    }
+    assert {"InstallationDetectionRequest", "PageData", "DrawingItem", "TextItem"} <= set(schema["components"]["schemas"])
+def text_label(text: str, x: float, y: float) -> dict:
+    return {
+        "text": text,
+        "position": {"x": x, "y": y},
+        "font_size": 8.0,
+        "font_name": "Arial",
+        "bbox": {"x0": x, "y0": y, "x1": x + 10, "y1": y + 10},
+    }
+
+def text_page(page_number: int, texts: list) -> dict:
+    return {
+        "page_number": page_number,
+        "page_size": {"width": 800.0, "height": 800.0},
+        "drawings": {"rectangles": [], "curves": [], "lines": []},
+        "texts": texts,
+    }
+
+# The same labels repeated across pages, between texts the prescreens or matcher skip
+TEXT_PAGES = [
+    text_page(1, [
+        text_label("WCD", 100, 100), text_label("A", 110, 110), text_label("WCD", 300, 100),
+        text_label("LIGHT SWITCH", 500, 100),
+    ]),
+    text_page(2, [
+        text_label("123", 100, 200), text_label("wcd", 100, 300), text_label("KEUKEN", 200, 300),
+        text_label("TV ANTENNE", 400, 300),
+    ]),
+    text_page(3, [text_label("TV ANTENNE", 50, 50), text_label("WCD", 60, 60), text_label("-", 70, 70)]),
+]
+
+def test_detect_installations_repeated_labels_across_pages():
+    client = TestClient(main.app)
+    response = client.post("/detect-installations/", json={"pages": TEXT_PAGES})
+    assert response.status_code == 200
+
+    pages = response.json()["pages"]
+    assert [page["page_number"] for page in pages] == [1, 2, 3]
+    symbols = [
+        [(s["type"], s["text"], (s["position"]["x"], s["position"]["y"]), s["bbox"]["x0"]) for s in page["symbols"]]
+        for page in pages
+    ]
+    assert symbols == [
+        [
+            ("WCD", "WCD", (105, 105), 100),
+            ("WCD", "WCD", (305, 105), 300),
+            ("LICHTPUNT", "LIGHT SWITCH", (505, 105), 500),
+            ("SCHAKELAAR", "LIGHT SWITCH", (505, 105), 500),
+        ],
+        [
+            ("WCD", "wcd", (105, 305), 100),
+            ("CAI", "TV ANTENNE", (405, 305), 400),
+        ],
+        [
+            ("CAI", "TV ANTENNE", (55, 55), 50),
+            ("WCD", "WCD", (65, 65), 60),
+        ],
+    ]
+    assert all(s["source"] == "text" for page in pages for s in page["symbols"])
+
+def test_extract_installation_symbols_shares_text_cache(monkeypatch):
+    matched_texts = []
+    match_installation_types = main.match_installation_types
+
+    def recording_match(text_upper: str) -> set:
+        matched_texts.append(text_upper)
+        return match_installation_types(text_upper)
+
+    monkeypatch.setattr(main, "match_installation_types", recording_match)
+    text_cache = {}
+    for page in TEXT_PAGES:
+        main._extract_installation_symbols(main.msgspec.convert(page, main.PageData), text_cache)
+
+    # Each distinct uppercased label is matched once; "A", "123" and "-" never reach the matcher
+    assert sorted(matched_texts) == ["KEUKEN", "LIGHT SWITCH", "TV ANTENNE", "WCD"]
+    assert text_cache["KEUKEN"] == ()
+
+def use_keyword_regexes(monkeypatch) -> None:
+    """Match keywords with the per-type regexes used when pyahocorasick is missing"""
+    monkeypatch.setattr(main, "KEYWORD_AUTOMATON", None)
+    monkeypatch.setattr(main, "KEYWORD_REGEXES", {
+        main.InstallationType[install_type]: main.re.compile("|".join(main.re.escape(keyword) for keyword in keywords))
+        for install_type, keywords in main.INSTALLATION_PATTERNS_UPPER.items()
+    })
+
+@pytest.mark.parametrize("text, expected", [
+    ("LIGHT SWITCH", {"LICHTPUNT", "SCHAKELAAR"}),
+    ("TV ANTENNE", {"CAI"}),
+    ("WATER DRAIN", {"WATERTAP", "DRAIN"}),
+    ("KEUKEN", set()),
+])
+def test_match_installation_types_regex_fallback(monkeypatch, text, expected):
+    use_keyword_regexes(monkeypatch)
+    assert {install_type.name for install_type in main.match_installation_types(text)} == expected
+
+def test_match_installation_types_regex_fallback_matches_automaton(monkeypatch):
+    texts = ["LIGHT SWITCH", "TV ANTENNE", "WCD 2X", "CV KETEL", "SMOKE DETECTOR", "SW1", "A", ""]
+    assert main.KEYWORD_AUTOMATON is not None
+    expected = [main.match_installation_types(text) for text in texts]
+    use_keyword_regexes(monkeypatch)
+    assert [main.match_installation_types(text) for text in texts] == expected
\ No newline at end of file